@@ -4,20 +4,40 @@ Export data for the music recommender web app.
 
 This script generates:
 1. tracks.json - Track metadata with all needed fields
+   (also tracks.arrow - the same records as a zstd-compressed Arrow IPC file)
 2. embeddings.bin - Binary embeddings (Float32Array for JS)
+   (also embeddings.f16.bin and embeddings.i8.bin + embeddings.scale.bin,
+   smaller float16 / per-dimension int8 quantized copies)
 3. tsne_coords.json - Pre-computed 3D t-SNE coordinates
+   (also tsne_coords.arrow - x/y/z float columns as Arrow IPC)
 4. search_index.json - Inverted index for fast search
+   (also search_index.bin - the same postings delta + varint encoded)
 5. genres.json - List of top genres for filtering
+
+The enriched track table and the embedding matrix are checkpointed to
+models/enriched.parquet and models/embeddings.npy, so a rerun (e.g. after a
+failed t-SNE) skips straight to the exports. They are rebuilt automatically
+when any input file changes; pass --force to rebuild them regardless.
 """
 
-import json
+import argparse
+import hashlib
+import multiprocessing as mp
 import struct
+import ijson
 import numpy as np
+import orjson
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
 from pathlib import Path
 from gensim.models import KeyedVectors
-from sklearn.manifold import TSNE
-from collections import defaultdict, Counter
+from openTSNE import TSNE
+from sklearn.decomposition import PCA
+from collections import Counter
+from itertools import islice
 import re
 import warnings
 warnings.filterwarnings('ignore')
@@ -27,6 +47,48 @@ PROJECT_ROOT = Path(__file__).parent.parent
 MODEL_DIR = PROJECT_ROOT / "models"
 DATA_DIR = PROJECT_ROOT / "data" / "processed"
 OUTPUT_DIR = PROJECT_ROOT / "web" / "public" / "data"
+PLAYLIST_DATA_PATH = Path.home() / ".cache/kagglehub/datasets/himanshuwagh/spotify-million/versions/1/data"
+
+# Parquet columns read by the export (album_name is optional)
+TRACK_COLUMNS = ['track_uri', 'track_name', 'artist_name', 'album_name', 'artist_uri']
+ARTIST_COLUMNS = ['artist_id', 'genres', 'artist_popularity', 'artist_followers']
+
+# Records serialized per write when streaming tracks.json
+TRACKS_BATCH_SIZE = 10_000
+
+# Tracks tokenized per worker task when building the search index
+SEARCH_SHARD_SIZE = 100_000
+
+# Search tokens: lowercase alphanumeric runs
+_TOK_RE = re.compile(r'[a-z0-9]+')
+
+
+def write_json(path, payload):
+    """Write compact JSON with orjson, serializing numpy arrays natively."""
+    with open(path, 'wb') as f:
+        f.write(orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY))
+
+
+def write_arrow(path, table):
+    """Write a table as a zstd-compressed Arrow IPC (Feather v2) file."""
+    feather.write_feather(table, path, compression='zstd', compression_level=3)
+
+
+def arrow_to_pandas(table):
+    """Convert to pandas, keeping list columns Arrow-backed so each value
+    (e.g. a track's genres) comes out as a plain list."""
+    return table.to_pandas(
+        types_mapper=lambda t: pd.ArrowDtype(t) if pa.types.is_list(t) else None,
+        split_blocks=True,
+        self_destruct=True,
+    )
+
+
+def parquet_columns(path, wanted):
+    """Return the wanted columns that exist in a Parquet file's schema."""
+    available = set(pq.read_schema(path).names)
+    return [c for c in wanted if c in available]
+
 
 def load_data():
     """Load embeddings, track metadata, and artist info."""
@@ -36,111 +98,279 @@ def load_data():
     wv = KeyedVectors.load(str(MODEL_DIR / "track2vec.wordvectors"))
     print(f"  Loaded {len(wv):,} track embeddings (dim={wv.vector_size})")
     
-    # Load track metadata
-    track_df = pd.read_parquet(MODEL_DIR / "track_metadata.parquet")
+    # Load track metadata, reading only the columns the export uses
+    track_path = MODEL_DIR / "track_metadata.parquet"
+    track_df = pq.read_table(
+        track_path, columns=parquet_columns(track_path, TRACK_COLUMNS), memory_map=True
+    ).to_pandas(types_mapper=pd.ArrowDtype, split_blocks=True, self_destruct=True)
     print(f"  Loaded {len(track_df):,} tracks metadata")
     
-    # Load artist info
-    artist_df = pd.read_parquet(DATA_DIR / "artist_info.parquet")
-    print(f"  Loaded {len(artist_df):,} artists info")
+    # Load artist info (kept as an Arrow table for the join)
+    artist_path = DATA_DIR / "artist_info.parquet"
+    artist_table = pq.read_table(
+        artist_path, columns=parquet_columns(artist_path, ARTIST_COLUMNS), memory_map=True
+    )
+    print(f"  Loaded {artist_table.num_rows:,} artists info")
     
-    return wv, track_df, artist_df
+    return wv, track_df, artist_table
+
+
+def count_slices(paths):
+    """Count track occurrences in a batch of MPD slices, streaming the JSON."""
+    counts = Counter()
+    for path in paths:
+        with open(path, 'rb') as f:
+            counts.update(ijson.items(f, 'playlists.item.tracks.item.track_uri'))
+    return counts
 
 
-def build_enriched_data(wv, track_df, artist_df):
+def file_fingerprint(paths):
+    """Hash file names, sizes and mtimes to detect changes in input data."""
+    digest = hashlib.sha1()
+    for path in paths:
+        if not path.exists():
+            digest.update(f"{path.name}:missing\n".encode())
+            continue
+        stat = path.stat()
+        digest.update(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+def list_slice_files():
+    """Return the raw MPD slice files, or an empty list if not downloaded."""
+    return sorted(PLAYLIST_DATA_PATH.glob("mpd.slice.*.json"))
+
+
+def load_playlist_counts(slice_files):
+    """Count playlists per track, cached as Parquet until the slices change."""
+    cache_path = MODEL_DIR / "playlist_counts.parquet"
+    hash_path = cache_path.with_suffix('.hash')
+    fingerprint = file_fingerprint(slice_files)
+    
+    if cache_path.exists() and hash_path.exists() and hash_path.read_text().strip() == fingerprint:
+        print("  Loading cached playlist counts...")
+        counts_df = pd.read_parquet(cache_path)
+    else:
+        print("  Loading playlist counts from raw data...")
+        # One batch of slices per worker: counting within a batch is a C-level
+        # Counter.update over the URI stream, while merging Counters in the
+        # parent loops in Python per key, so return as few of them as possible
+        num_batches = min(len(slice_files), mp.cpu_count()) or 1
+        batches = [slice_files[i::num_batches] for i in range(num_batches)]
+        track_playlist_count = Counter()
+        with mp.Pool(num_batches) as pool:
+            for counts in pool.imap_unordered(count_slices, batches):
+                track_playlist_count.update(counts)
+        counts_df = pd.DataFrame({
+            'track_uri': list(track_playlist_count),
+            'playlist_count': list(track_playlist_count.values()),
+        })
+        counts_df.to_parquet(cache_path, compression='zstd')
+        hash_path.write_text(fingerprint)
+    
+    return counts_df.set_index('track_uri')['playlist_count']
+
+
+def build_enriched_data(wv, track_df, artist_table):
     """Merge track and artist data, filter to vocab."""
     print("\nBuilding enriched dataset...")
     
-    # Extract IDs from URIs
-    def extract_id(uri):
-        return uri.split(":")[-1]
-    
+    # Extract IDs from URIs (vectorized regex, no per-row Python call; works
+    # for both object and Arrow-backed string columns)
     track_df = track_df.copy()
-    track_df['track_id'] = track_df['track_uri'].apply(extract_id)
-    track_df['artist_id'] = track_df['artist_uri'].apply(extract_id)
+    track_df['track_id'] = track_df['track_uri'].str.replace(r'^.*:', '', regex=True)
+    track_df['artist_id'] = track_df['artist_uri'].str.replace(r'^.*:', '', regex=True)
     
     # Load playlist counts from raw data (if available)
-    PLAYLIST_DATA_PATH = Path.home() / ".cache/kagglehub/datasets/himanshuwagh/spotify-million/versions/1/data"
-    
     if PLAYLIST_DATA_PATH.exists():
-        print("  Loading playlist counts from raw data...")
-        slice_files = sorted(PLAYLIST_DATA_PATH.glob("mpd.slice.*.json"))
-        track_playlist_count = Counter()
-        for slice_file in slice_files:
-            with open(slice_file) as f:
-                data = json.load(f)
-                for playlist in data["playlists"]:
-                    for track in playlist["tracks"]:
-                        track_playlist_count[track["track_uri"]] += 1
+        slice_files = list_slice_files()
+        track_playlist_count = load_playlist_counts(slice_files)
         track_df['playlist_count'] = track_df['track_uri'].map(track_playlist_count).fillna(0).astype(int)
     else:
         print("  Warning: Raw playlist data not found, using 0 for playlist counts")
         track_df['playlist_count'] = 0
     
-    # Merge with artist info
-    artist_df_slim = artist_df.drop(columns=['artist_name'], errors='ignore')
-    enriched_df = track_df.merge(artist_df_slim, on='artist_id', how='left')
-    
-    # Normalize genres
-    def normalize_genres(x):
-        if x is None or (isinstance(x, float) and np.isnan(x)):
-            return []
-        if hasattr(x, 'tolist'):
-            return x.tolist()
-        if isinstance(x, list):
-            return x
-        return []
-    
-    enriched_df['genres'] = enriched_df['genres'].apply(normalize_genres)
+    # Left join with artist info in Arrow. Acero cannot carry list columns
+    # (genres) through a hash join, so join the keys to artist row numbers
+    # and gather the artist columns with take(). Acero returns duplicate
+    # matches in no fixed order, so sort on the track row and then the artist
+    # row to get pandas' left-merge order (and a stable keep='first' below).
+    track_table = pa.Table.from_pandas(track_df, preserve_index=False)
+    # Cast keys to one string type; pandas and Parquet may give string or large_string
+    artist_rows = pa.table({
+        'artist_id': artist_table['artist_id'].cast(pa.large_string()),
+        '_artist_row': np.arange(artist_table.num_rows),
+    })
+    track_rows = pa.table({
+        'artist_id': track_table['artist_id'].cast(pa.large_string()),
+        '_track_row': np.arange(track_table.num_rows),
+    })
+    matches = track_rows.join(artist_rows, keys='artist_id', join_type='left outer').sort_by(
+        [('_track_row', 'ascending'), ('_artist_row', 'ascending')]
+    )
+    
+    joined = track_table.take(matches['_track_row'])
+    artist_columns = artist_table.drop_columns(['artist_id']).take(matches['_artist_row'])
+    for name, column in zip(artist_columns.column_names, artist_columns.columns):
+        if name == 'genres':
+            # Tracks without artist info get an empty genre list, not null
+            column = pc.fill_null(column, pa.scalar([], type=column.type))
+        joined = joined.append_column(name, column)
+    
+    enriched_df = arrow_to_pandas(joined)
     enriched_df['artist_popularity'] = enriched_df['artist_popularity'].fillna(50).astype(int)
     enriched_df['artist_followers'] = enriched_df['artist_followers'].fillna(0).astype(int)
     
-    # Filter to only tracks in vocabulary
-    vocab_set = set(wv.key_to_index.keys())
-    enriched_df = enriched_df[enriched_df['track_uri'].isin(vocab_set)]
+    # Filter to only tracks in vocabulary (key_to_index is already a dict,
+    # no need to copy its keys into a set)
+    enriched_df = enriched_df[enriched_df['track_uri'].isin(wv.key_to_index)]
     
     # Drop duplicates
     enriched_df = enriched_df.drop_duplicates(subset='track_uri', keep='first')
     
     print(f"  Enriched dataset: {len(enriched_df):,} tracks in vocabulary")
     
-    return enriched_df, vocab_set
+    return enriched_df
 
 
 def export_tracks_json(enriched_df, output_dir):
     """Export track metadata as JSON."""
     print("\nExporting tracks.json...")
     
-    tracks = []
-    for _, row in enriched_df.iterrows():
-        tracks.append({
-            "id": row['track_uri'],
-            "name": row['track_name'],
-            "artist": row['artist_name'],
-            "album": row.get('album_name', ''),
-            "genres": row['genres'][:5],  # Limit to 5 genres
-            "popularity": int(row['artist_popularity']),
-            "playlistCount": int(row['playlist_count']),
-        })
+    # Pull each column out once and zip them, instead of building a Series per row
+    uris = enriched_df['track_uri'].tolist()
+    names = enriched_df['track_name'].tolist()
+    artists = enriched_df['artist_name'].tolist()
+    albums = enriched_df.get('album_name', pd.Series('', index=enriched_df.index)).fillna('').tolist()
+    genres = [g[:5] for g in enriched_df['genres'].tolist()]  # Limit to 5 genres
+    popularity = enriched_df['artist_popularity'].astype(int).tolist()
+    playlist_counts = enriched_df['playlist_count'].astype(int).tolist()
+    
+    records = (
+        {
+            "id": uri,
+            "name": name,
+            "artist": artist,
+            "album": album,
+            "genres": track_genres,
+            "popularity": pop,
+            "playlistCount": count,
+        }
+        for uri, name, artist, album, track_genres, pop, count
+        in zip(uris, names, artists, albums, genres, popularity, playlist_counts)
+    )
     
+    # Stream the records out in batches so neither the full list of dicts
+    # nor the full JSON string is ever held in memory
     output_path = output_dir / "tracks.json"
-    with open(output_path, 'w') as f:
-        json.dump({"tracks": tracks}, f, separators=(',', ':'))
+    with open(output_path, 'wb') as f:
+        f.write(b'{"tracks":[')
+        first = True
+        while batch := list(islice(records, TRACKS_BATCH_SIZE)):
+            if not first:
+                f.write(b',')
+            # Drop the enclosing [ ] so batches join into one array
+            f.write(orjson.dumps(batch, option=orjson.OPT_SERIALIZE_NUMPY)[1:-1])
+            first = False
+        f.write(b']}')
     
     size_mb = output_path.stat().st_size / (1024 * 1024)
-    print(f"  Saved {len(tracks):,} tracks ({size_mb:.1f} MB)")
+    print(f"  Saved {len(uris):,} tracks ({size_mb:.1f} MB)")
+    
+    # Columnar copy for the browser; artist/album names repeat heavily
+    arrow_path = output_dir / "tracks.arrow"
+    write_arrow(arrow_path, pa.table({
+        "id": uris,
+        "name": names,
+        "artist": pa.array(artists, type=pa.string()).dictionary_encode(),
+        "album": pa.array(albums, type=pa.string()).dictionary_encode(),
+        "genres": pa.array(genres, type=pa.list_(pa.string())),
+        "popularity": pa.array(popularity, type=pa.int32()),
+        "playlistCount": pa.array(playlist_counts, type=pa.int32()),
+    }))
+    
+    size_mb = arrow_path.stat().st_size / (1024 * 1024)
+    print(f"  Saved tracks.arrow ({size_mb:.1f} MB)")
+
+
+def extract_embeddings(wv, enriched_df):
+    """Gather L2-normalized embeddings in track order."""
+    # Get embeddings in the same order as tracks, as one gather from wv.vectors
+    track_uris = enriched_df['track_uri'].tolist()
+    idx = np.fromiter((wv.key_to_index[uri] for uri in track_uris), dtype=np.int64, count=len(track_uris))
+    embeddings = np.ascontiguousarray(wv.vectors[idx], dtype=np.float32)
+    
+    # L2-normalize rows so cosine similarity is a plain dot product
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    embeddings /= norms
     
-    return tracks
+    return embeddings
+
 
+def input_fingerprint():
+    """Fingerprint every input the checkpoint is derived from.
+    
+    Covers the embeddings (including gensim's .npy sidecars), both metadata
+    Parquet files, and the MPD slices behind playlist_count.
+    """
+    paths = sorted(MODEL_DIR.glob("track2vec.wordvectors*"))
+    paths += [MODEL_DIR / "track_metadata.parquet", DATA_DIR / "artist_info.parquet"]
+    paths += list_slice_files()
+    return file_fingerprint(paths)
 
-def export_embeddings_binary(wv, enriched_df, output_dir):
+
+def save_checkpoint(enriched_df, embeddings, fingerprint):
+    """Checkpoint the enriched table and embeddings together.
+    
+    Each file is written to a temp path and renamed into place, so a crash
+    mid-write never leaves a truncated checkpoint behind. The input
+    fingerprint is removed first and written last, so the checkpoint is only
+    valid once both files are in place.
+    """
+    hash_path = MODEL_DIR / "enriched.hash"
+    hash_path.unlink(missing_ok=True)
+    
+    enriched_tmp = MODEL_DIR / "enriched.parquet.tmp"
+    embeddings_tmp = MODEL_DIR / "embeddings.npy.tmp"
+    enriched_df.to_parquet(enriched_tmp, compression='zstd', index=False)
+    with open(embeddings_tmp, 'wb') as f:
+        np.save(f, embeddings)
+    
+    enriched_tmp.replace(MODEL_DIR / "enriched.parquet")
+    embeddings_tmp.replace(MODEL_DIR / "embeddings.npy")
+    hash_path.write_text(fingerprint)
+
+
+def load_checkpoint(fingerprint):
+    """Load the checkpointed enriched table and embeddings.
+    
+    Returns None if a file is missing, the inputs changed since the
+    checkpoint was written, or the row counts disagree.
+    """
+    enriched_path = MODEL_DIR / "enriched.parquet"
+    embeddings_path = MODEL_DIR / "embeddings.npy"
+    hash_path = MODEL_DIR / "enriched.hash"
+    if not (enriched_path.exists() and embeddings_path.exists() and hash_path.exists()):
+        return None
+    if hash_path.read_text().strip() != fingerprint:
+        print("  Inputs changed since the last checkpoint, rebuilding")
+        return None
+    
+    enriched_df = arrow_to_pandas(pq.read_table(enriched_path, memory_map=True))
+    embeddings = np.load(embeddings_path, mmap_mode='r')
+    if len(enriched_df) != embeddings.shape[0]:
+        print(f"  Warning: checkpoint has {len(enriched_df):,} tracks but "
+              f"{embeddings.shape[0]:,} embeddings, rebuilding")
+        return None
+    
+    return enriched_df, embeddings
+
+
+def export_embeddings_binary(embeddings, output_dir):
     """Export embeddings as binary Float32Array."""
     print("\nExporting embeddings.bin...")
     
-    # Get embeddings in the same order as tracks
-    track_uris = enriched_df['track_uri'].tolist()
-    embeddings = np.array([wv[uri] for uri in track_uris], dtype=np.float32)
-    
     # Save as binary (can be loaded as Float32Array in JS)
     output_path = output_dir / "embeddings.bin"
     embeddings.tofile(output_path)
@@ -148,13 +378,42 @@ def export_embeddings_binary(wv, enriched_df, output_dir):
     size_mb = output_path.stat().st_size / (1024 * 1024)
     print(f"  Saved {embeddings.shape[0]:,} embeddings ({embeddings.shape[1]} dims, {size_mb:.1f} MB)")
     
+    # Half-precision copy (half the bytes on the wire)
+    f16_path = output_dir / "embeddings.f16.bin"
+    embeddings.astype(np.float16).tofile(f16_path)
+    
+    # Symmetric int8 copy with one float32 scale per dimension:
+    # value ~= int8 * scale[dim]
+    scale = np.abs(embeddings).max(axis=0, initial=0) / 127
+    scale[scale == 0] = 1
+    quantized = np.round(embeddings / scale).clip(-127, 127).astype(np.int8)
+    i8_path = output_dir / "embeddings.i8.bin"
+    scale_path = output_dir / "embeddings.scale.bin"
+    quantized.tofile(i8_path)
+    scale.astype(np.float32).tofile(scale_path)
+    
+    f16_mb = f16_path.stat().st_size / (1024 * 1024)
+    i8_mb = i8_path.stat().st_size / (1024 * 1024)
+    print(f"  Saved float16 ({f16_mb:.1f} MB) and int8 ({i8_mb:.1f} MB) copies")
+    
     # Also save dimensions metadata
     meta_path = output_dir / "embeddings_meta.json"
-    with open(meta_path, 'w') as f:
-        json.dump({
-            "numTracks": embeddings.shape[0],
-            "dimensions": embeddings.shape[1]
-        }, f)
+    write_json(meta_path, {
+        "numTracks": embeddings.shape[0],
+        "dimensions": embeddings.shape[1],
+        "dtype": "float32",
+        "normalized": True,
+        "variants": {
+            "float16": {"file": f16_path.name, "dtype": "float16"},
+            "int8": {
+                "file": i8_path.name,
+                "dtype": "int8",
+                "scaleFile": scale_path.name,
+                "scaleDtype": "float32",
+                "scaleLength": int(scale.shape[0]),
+            },
+        },
+    })
     
     return embeddings
 
@@ -163,91 +422,203 @@ def compute_tsne(embeddings, output_dir):
     """Compute 3D t-SNE coordinates."""
     print("\nComputing t-SNE (this may take 10-30 minutes)...")
     
+    # Reduce to 50 dims first so the t-SNE neighbor search works on fewer dims
+    tsne_input = embeddings
+    if min(embeddings.shape) > 50:
+        pca = PCA(n_components=50, svd_solver='randomized', random_state=42)
+        tsne_input = pca.fit_transform(embeddings).astype(np.float32)
+        print(f"  PCA {embeddings.shape[1]} -> 50 dims "
+              f"({pca.explained_variance_ratio_.sum():.1%} variance kept)")
+    
+    # openTSNE parallelizes the KNN search and gradient across cores. Its FFT
+    # interpolation only supports up to 2D, so 3D uses Barnes-Hut.
     tsne = TSNE(
         n_components=3,
         perplexity=30,
-        max_iter=1000,
+        early_exaggeration_iter=250,
+        n_iter=750,
+        negative_gradient_method='bh',
+        n_jobs=-1,
         random_state=42,
-        verbose=1
+        verbose=True
     )
     
-    coords_3d = tsne.fit_transform(embeddings)
+    coords_3d = np.asarray(tsne.fit(tsne_input), dtype=np.float32)
     
     # Normalize to [-1, 1] range for easier rendering
     coords_min = coords_3d.min(axis=0)
     coords_max = coords_3d.max(axis=0)
     coords_normalized = 2 * (coords_3d - coords_min) / (coords_max - coords_min) - 1
     
-    # Save as JSON
+    # Save as JSON (orjson serializes the array directly, no tolist() copy)
     output_path = output_dir / "tsne_coords.json"
-    with open(output_path, 'w') as f:
-        json.dump({
-            "coords": coords_normalized.tolist()
-        }, f, separators=(',', ':'))
+    write_json(output_path, {"coords": coords_normalized})
     
     size_mb = output_path.stat().st_size / (1024 * 1024)
     print(f"  Saved t-SNE coordinates ({size_mb:.1f} MB)")
     
+    arrow_path = output_dir / "tsne_coords.arrow"
+    write_arrow(arrow_path, pa.table({
+        axis: pa.array(coords_normalized[:, i]) for i, axis in enumerate("xyz")
+    }))
+    
     return coords_normalized
 
 
-def build_search_index(tracks, output_dir):
+def varint_encode(values):
+    """LEB128-encode non-negative integers.
+    
+    Returns the encoded bytes as a uint8 array along with the number of
+    bytes used by each value.
+    """
+    values = np.asarray(values, dtype=np.uint64)
+    nbytes = np.ones(len(values), dtype=np.int64)
+    for shift in (7, 14, 21, 28, 35):
+        nbytes += values >= (1 << shift)
+    
+    out = np.empty(int(nbytes.sum()), dtype=np.uint8)
+    starts = np.cumsum(nbytes) - nbytes
+    for k in range(int(nbytes.max(initial=0))):
+        mask = nbytes > k
+        low_bits = (values[mask] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        more = (nbytes[mask] > k + 1).astype(np.uint64) << np.uint64(7)
+        out[starts[mask] + k] = low_bits | more
+    
+    return out, nbytes
+
+
+def write_postings_binary(path, index):
+    """Write an inverted index as delta + varint encoded postings.
+    
+    Layout (little-endian):
+      u32 num_tokens, u32 token_table_bytes
+      token table: ASCII tokens joined by newlines, zero-padded to 4 bytes
+      u32 offsets[num_tokens + 1]: byte range of each posting in the payload
+      payload: per token, the first doc id then gaps, each as a varint
+    """
+    tokens = list(index)
+    lengths = np.fromiter((len(index[t]) for t in tokens), dtype=np.int64, count=len(tokens))
+    token_bounds = np.concatenate(([0], np.cumsum(lengths)))
+    ids = np.concatenate([np.asarray(index[t], dtype=np.int64) for t in tokens] or [np.empty(0, np.int64)])
+    
+    # Gaps within each posting; every posting restarts from its absolute first id
+    deltas = np.diff(ids, prepend=0)
+    deltas[token_bounds[:-1]] = ids[token_bounds[:-1]]
+    payload, nbytes = varint_encode(deltas)
+    offsets = np.concatenate(([0], np.cumsum(nbytes)))[token_bounds]
+    
+    token_table = "\n".join(tokens).encode("ascii")
+    token_table += b"\0" * (-len(token_table) % 4)
+    
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<II', len(tokens), len(token_table)))
+        f.write(token_table)
+        f.write(offsets.astype('<u4').tobytes())
+        f.write(payload.tobytes())
+
+
+def index_shard(shard):
+    """Build postings for one contiguous shard of lowercased search texts.
+    
+    Returns (tokens, track_ids, bounds): the postings for tokens[k] are
+    track_ids[bounds[k]:bounds[k + 1]], ascending global row positions.
+    """
+    offset, texts = shard
+    
+    # Flat (token, track id) stream over the shard
+    tokens = []
+    docs = []
+    for i, text in enumerate(texts, start=offset):
+        track_tokens = [t for t in _TOK_RE.findall(text) if len(t) >= 2]
+        tokens.extend(track_tokens)
+        docs.extend([i] * len(track_tokens))
+    
+    # Bucket the pairs by token id. The stable sort keeps track ids ascending
+    # within each token, so repeats of a (token, track) pair are adjacent.
+    codes, uniques = pd.factorize(np.asarray(tokens, dtype=object))
+    order = np.argsort(codes, kind='stable')
+    codes_sorted = codes[order]
+    docs_sorted = np.asarray(docs, dtype=np.int32)[order]
+    
+    keep = np.ones(len(codes_sorted), dtype=bool)
+    keep[1:] = (codes_sorted[1:] != codes_sorted[:-1]) | (docs_sorted[1:] != docs_sorted[:-1])
+    codes_sorted = codes_sorted[keep]
+    docs_sorted = docs_sorted[keep]
+    
+    bounds = np.searchsorted(codes_sorted, np.arange(len(uniques) + 1))
+    return list(uniques), docs_sorted, bounds
+
+
+def build_search_index(enriched_df, output_dir):
     """Build inverted index for fast search."""
     print("\nBuilding search index...")
     
-    # Tokenize function
-    def tokenize(text):
-        if not text:
-            return []
-        # Convert to lowercase and split on non-alphanumeric
-        tokens = re.findall(r'[a-z0-9]+', text.lower())
-        return [t for t in tokens if len(t) >= 2]
-    
-    # Build inverted index
-    index = defaultdict(list)
-    
-    for i, track in enumerate(tracks):
-        # Index track name tokens
-        for token in tokenize(track['name']):
-            if i not in index[token]:
-                index[token].append(i)
-        
-        # Index artist name tokens
-        for token in tokenize(track['artist']):
-            if i not in index[token]:
-                index[token].append(i)
+    # Track name and artist are tokenized together. Track ids are row
+    # positions, matching the order of tracks.json.
+    texts = (
+        enriched_df['track_name'].fillna('') + ' ' + enriched_df['artist_name'].fillna('')
+    ).str.lower().tolist()
+    
+    # Index contiguous shards in parallel, then merge in shard order so
+    # every posting stays sorted without re-sorting
+    shards = [
+        (start, texts[start:start + SEARCH_SHARD_SIZE])
+        for start in range(0, len(texts), SEARCH_SHARD_SIZE)
+    ]
+    pieces = {}
+    with mp.Pool(min(len(shards), mp.cpu_count()) or 1) as pool:
+        for tokens, docs, bounds in pool.imap(index_shard, shards):
+            for k, token in enumerate(tokens):
+                pieces.setdefault(token, []).append(docs[bounds[k]:bounds[k + 1]])
+    
+    index = {
+        token: parts[0] if len(parts) == 1 else np.concatenate(parts)
+        for token, parts in pieces.items()
+    }
     
-    # Convert to regular dict and save
     output_path = output_dir / "search_index.json"
-    with open(output_path, 'w') as f:
-        json.dump(dict(index), f, separators=(',', ':'))
+    write_json(output_path, dict(index))
     
     size_mb = output_path.stat().st_size / (1024 * 1024)
     print(f"  Saved search index ({len(index):,} tokens, {size_mb:.1f} MB)")
+    
+    binary_path = output_dir / "search_index.bin"
+    write_postings_binary(binary_path, index)
+    
+    size_mb = binary_path.stat().st_size / (1024 * 1024)
+    print(f"  Saved search_index.bin ({size_mb:.1f} MB)")
 
 
 def export_genres(enriched_df, output_dir):
     """Export list of top genres."""
     print("\nExporting genres.json...")
     
-    # Count tracks per genre
-    genre_counts = Counter()
-    for genres in enriched_df['genres']:
-        for genre in genres:
-            genre_counts[genre] += 1
+    # Count tracks per genre with Arrow kernels (genres is an Arrow list column)
+    genre_counts = pc.value_counts(pc.list_flatten(pa.array(enriched_df['genres'])))
+    names = genre_counts.field('values').to_numpy(zero_copy_only=False)
+    counts = genre_counts.field('counts').to_numpy()
     
-    # Get top 50 genres
-    top_genres = [{"name": g, "count": c} for g, c in genre_counts.most_common(50)]
+    # Get top 50 genres; value_counts lists genres by first appearance, so a
+    # stable sort breaks ties the same way Counter.most_common does
+    top = np.argsort(-counts, kind='stable')[:50]
+    top_genres = [{"name": names[i], "count": int(counts[i])} for i in top]
     
     output_path = output_dir / "genres.json"
-    with open(output_path, 'w') as f:
-        json.dump({"genres": top_genres}, f, separators=(',', ':'))
+    write_json(output_path, {"genres": top_genres})
     
     print(f"  Saved {len(top_genres)} genres")
 
 
 def main():
     """Main export function."""
+    parser = argparse.ArgumentParser(description="Export data for the music recommender web app.")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rebuild the enriched dataset and embeddings instead of reusing the checkpoints",
+    )
+    args = parser.parse_args()
+    
     print("=" * 60)
     print("Music Recommender Data Export")
     print("=" * 60)
@@ -256,23 +627,38 @@ def main():
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
     print(f"\nOutput directory: {OUTPUT_DIR}")
     
-    # Load data
-    wv, track_df, artist_df = load_data()
+    # Resume from the checkpoints of a previous run
+    fingerprint = input_fingerprint()
+    checkpoint = None
+    if not args.force:
+        print("\nLoading checkpoints (use --force to rebuild)...")
+        checkpoint = load_checkpoint(fingerprint)
     
-    # Build enriched dataset
-    enriched_df, vocab_set = build_enriched_data(wv, track_df, artist_df)
+    if checkpoint is not None:
+        enriched_df, embeddings = checkpoint
+        print(f"  Loaded {len(enriched_df):,} tracks and {embeddings.shape[0]:,} embeddings")
+    else:
+        # Load data
+        wv, track_df, artist_table = load_data()
+        
+        # Build enriched dataset
+        enriched_df = build_enriched_data(wv, track_df, artist_table)
+        embeddings = extract_embeddings(wv, enriched_df)
+        
+        # Checkpoint so later runs can skip loading and enrichment
+        save_checkpoint(enriched_df, embeddings, fingerprint)
     
     # Export tracks
-    tracks = export_tracks_json(enriched_df, OUTPUT_DIR)
+    export_tracks_json(enriched_df, OUTPUT_DIR)
     
     # Export embeddings
-    embeddings = export_embeddings_binary(wv, enriched_df, OUTPUT_DIR)
+    export_embeddings_binary(embeddings, OUTPUT_DIR)
     
     # Compute and export t-SNE
     compute_tsne(embeddings, OUTPUT_DIR)
     
     # Build search index
-    build_search_index(tracks, OUTPUT_DIR)
+    build_search_index(enriched_df, OUTPUT_DIR)
     
     # Export genres
     export_genres(enriched_df, OUTPUT_DIR)
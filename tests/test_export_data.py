@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import json
+import struct
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.export_data import build_search_index, export_embeddings_binary, varint_encode, write_postings_binary
+
+
+class SearchIndexBinaryTests(unittest.TestCase):
+    def test_varint_boundaries(self) -> None:
+        encoded, nbytes = varint_encode([0, 127, 128, 16383, 16384])
+        self.assertEqual(
+            encoded.tobytes(),
+            bytes([0x00, 0x7F, 0x80, 0x01, 0xFF, 0x7F, 0x80, 0x80, 0x01]),
+        )
+        self.assertEqual(nbytes.tolist(), [1, 1, 2, 2, 3])
+
+    def test_postings_round_trip(self) -> None:
+        index = {
+            "boundaries": [0, 127, 128, 16383, 16384, 2**21 - 1, 2**21, 2**28, 2**31 + 7],
+            # Gaps of exactly 127 / 128 / 16383 / 16384 after an absolute first id
+            "gaps": [5, 132, 260, 16643, 33027],
+            "single": [42],
+        }
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "search_index.bin"
+            write_postings_binary(path, index)
+            self.assertEqual(read_postings_binary(path), index)
+
+    def test_empty_index(self) -> None:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "search_index.bin"
+            write_postings_binary(path, {})
+            self.assertEqual(read_postings_binary(path), {})
+            self.assertEqual(path.read_bytes(), struct.pack("<III", 0, 0, 0))
+
+    def test_binary_matches_json_index(self) -> None:
+        enriched_df = pd.DataFrame(
+            {
+                "track_name": ["Blue Night", "Night Rock", None, "A Blue Blue Song"],
+                "artist_name": ["The Blues", "Rockers", "Night Owls", "The Blues"],
+            }
+        )
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_dir = Path(temp_dir)
+            build_search_index(enriched_df, output_dir)
+
+            expected = json.loads((output_dir / "search_index.json").read_text())
+            self.assertEqual(expected["blue"], [0, 3])
+            self.assertEqual(expected["night"], [0, 1, 2])
+            self.assertEqual(read_postings_binary(output_dir / "search_index.bin"), expected)
+
+
+class EmbeddingQuantizationTests(unittest.TestCase):
+    def test_quantized_copies_dequantize_close_to_float32(self) -> None:
+        embeddings = np.random.RandomState(0).randn(50, 8).astype(np.float32)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings[:, 3] = 0  # an all-zero dimension must not divide by zero
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_dir = Path(temp_dir)
+            export_embeddings_binary(embeddings, output_dir)
+            meta = json.loads((output_dir / "embeddings_meta.json").read_text())
+            int8_meta = meta["variants"]["int8"]
+
+            self.assertEqual((meta["numTracks"], meta["dimensions"]), (50, 8))
+            self.assertEqual(int8_meta["scaleLength"], 8)
+
+            f16 = np.fromfile(output_dir / meta["variants"]["float16"]["file"], dtype=np.float16).reshape(50, 8)
+            np.testing.assert_allclose(f16, embeddings, atol=1e-3)
+
+            quantized = np.fromfile(output_dir / int8_meta["file"], dtype=np.int8).reshape(50, 8)
+            scale = np.fromfile(output_dir / int8_meta["scaleFile"], dtype=np.float32)
+            self.assertEqual(scale.shape, (8,))
+            self.assertTrue(np.all(scale > 0))
+            self.assertTrue(np.all(np.abs(quantized) <= 127))
+            error = np.abs(quantized * scale - embeddings)
+            self.assertTrue(np.all(error <= scale / 2 + 1e-6))
+            self.assertTrue(np.all(quantized[:, 3] == 0))
+
+
+def read_postings_binary(path: Path) -> dict[str, list[int]]:
+    buffer = path.read_bytes()
+    num_tokens, table_bytes = struct.unpack_from("<II", buffer, 0)
+    table = buffer[8 : 8 + table_bytes].rstrip(b"\0").decode("ascii")
+    tokens = table.split("\n") if num_tokens else []
+    offsets = struct.unpack_from(f"<{num_tokens + 1}I", buffer, 8 + table_bytes)
+    payload = buffer[8 + table_bytes + 4 * (num_tokens + 1) :]
+
+    index: dict[str, list[int]] = {}
+    for k, token in enumerate(tokens):
+        postings: list[int] = []
+        value = shift = 0
+        for byte in payload[offsets[k] : offsets[k + 1]]:
+            value |= (byte & 0x7F) << shift
+            shift += 7
+            if not byte & 0x80:
+                postings.append(value if not postings else postings[-1] + value)
+                value = shift = 0
+        index[token] = postings
+    return index
+
+
+if __name__ == "__main__":
+    unittest.main()